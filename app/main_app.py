@@ -1,12 +1,34 @@
 # 1. Import Libraries
 import os
-from fastapi import FastAPI, Query
+import json
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from generation.generate_answer import generate_answer
+from generation.generate_answer import stream_answer
+from retriever.query_retriever import load_vectorstore, load_chunk_table, retrieve_docs, DenseSearchBatcher
+
+
+logger = logging.getLogger(__name__)
 
 
 # 2. Initialize FastAPI App
-app = FastAPI(title="Generic RAG API", version="0.0.1")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the FAISS vectorstore and chunk table once at startup and share them across
+    requests, and run the dense-search micro-batcher for the lifetime of the app.
+    """
+    app.state.vs = load_vectorstore()
+    load_chunk_table(vs=app.state.vs)
+    app.state.dense_batcher = DenseSearchBatcher(app.state.vs)
+    app.state.dense_batcher.start()
+    yield
+    await app.state.dense_batcher.stop()
+
+
+app = FastAPI(title="Generic RAG API", version="0.0.1", lifespan=lifespan)
 
 
 # 3. Define Request Model
@@ -20,11 +42,38 @@ def root():
     return {"message": "Welcome to the Generic RAG API!"}
 
 
-# 5. Endpoint to Handle Questions
+# 5. Function to Frame Answer Tokens as Server-Sent Events
+async def _sse_events(first_token, tokens):
+    """
+    Wrap each streamed token in an SSE `data:` frame, then signal completion.
+
+    The response headers are already sent by now, so a failure mid-stream is
+    reported as an `event: error` frame instead of a silently truncated stream.
+    """
+    try:
+        if first_token is not None:
+            yield f"data: {json.dumps({'token': first_token})}\n\n"
+        async for token in tokens:
+            yield f"data: {json.dumps({'token': token})}\n\n"
+    except Exception:
+        logger.exception("Answer stream failed")
+        yield f"event: error\ndata: {json.dumps({'error': 'answer generation failed'})}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+
+# 6. Endpoint to Handle Questions
 @app.post("/ask")
-def ask_question(request: QueryRequest):
+async def ask_question(request: QueryRequest, http_request: Request):
     """
-    Endpoint to get an AI-generated answers from the Generic RAG system.
+    Endpoint to stream an AI-generated answer from the Generic RAG system.
+
+    Retrieval and the first answer token are awaited before the response starts,
+    so failures up to that point surface as regular HTTP errors.
     """
-    answer = generate_answer(request.question)
-    return {"question": request.question, "answer": answer}
+    retrieved_docs = await retrieve_docs(request.question,
+                                         vs=http_request.app.state.vs,
+                                         dense_batcher=http_request.app.state.dense_batcher)
+    tokens = stream_answer(request.question, retrieved_docs)
+    first_token = await anext(tokens, None)
+    return StreamingResponse(_sse_events(first_token, tokens), media_type="text/event-stream")
@@ -1,57 +1,87 @@
 import os
+import asyncio
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 from retriever.query_retriever import retrieve_docs
 
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+client = AsyncOpenAI(api_key=api_key)
 
 VECTORSTORE_DIR = "vectorstores/faiss_topic"
 
+# Static parts of the prompt, built once at import time
+_PROMPT_HEAD = (
+    "You are a knowledgeable assistant specialized in scientific research.\n"
+    "You will answer questions based on the provided context from internal documents.\n\n"
+    "Context: "
+)
+_PROMPT_MID = "\n\nQuestion: "
+_PROMPT_TAIL = (
+    "\n\nAnswer concisely and accurately based ONLY on the context above. "
+    "If the answer is not in the context, say \"I don't have that information from the provided documents.\""
+)
+
 def build_prompt(query, retrieved_docs):
     """
     Build a prompt combining the query and retrieved context.
     """
     context = "\n\n".join([f"Source: {doc.metadata['source']}\nContent: {doc.page_content}"
                            for doc in retrieved_docs])
-    
-    prompt = f"""
-                    You are a knowledgeable assistant specialized in scientific research.
-                    You will answer questions based on the provided context from internal documents.
-
-                    Context: {context}
 
-                    Question: {query}
+    return "".join([_PROMPT_HEAD, context, _PROMPT_MID, query, _PROMPT_TAIL])
 
-                    Answer concisely and accurately based ONLY on the context above. If the answer is not in the context, say "I don't have that information from the provided documents."
-            """
-    return prompt
-
-def generate_answer(query, persist_path=VECTORSTORE_DIR, k=5, model="gpt-3.5-turbo"):
+async def stream_answer(query, retrieved_docs, model="gpt-3.5-turbo"):
     """
-    Retrieves relevant docs and generates an answer using OpenAI's Chat model.
+    Streams an answer from OpenAI's Chat model, token by token, for already retrieved docs.
     """
-    retrieved_docs = retrieve_docs(query, persist_path, k)
-
     if not retrieved_docs:
-        return "No relevant documents found."
+        yield "No relevant documents found."
+        return
 
     prompt = build_prompt(query, retrieved_docs)
 
-    response = client.chat.completions.create(
+    stream = await client.chat.completions.create(
         model=model,
         messages=[
                         {"role": "system", "content": "You are a helpful assistant for scientific domain experts."},
                         {"role": "user", "content": prompt}
                 ],
         temperature=0.2,
-        max_tokens=500
+        max_tokens=500,
+        stream=True
     )
 
-    return response.choices[0].message.content
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+async def generate_answer_stream(query, persist_path=VECTORSTORE_DIR, k=5, model="gpt-3.5-turbo", vs=None,
+                                 dense_batcher=None):
+    """
+    Retrieves relevant docs and streams an answer from OpenAI's Chat model, token by token.
+
+    Pass a pre-loaded FAISS vectorstore as `vs` to skip loading it from `persist_path`,
+    and a running `DenseSearchBatcher` to share dense searches with concurrent requests.
+    """
+    retrieved_docs = await retrieve_docs(query, persist_path=persist_path, k=k, vs=vs, dense_batcher=dense_batcher)
+
+    async for token in stream_answer(query, retrieved_docs, model):
+        yield token
+
+async def generate_answer(query, persist_path=VECTORSTORE_DIR, k=5, model="gpt-3.5-turbo", vs=None,
+                          dense_batcher=None):
+    """
+    Retrieves relevant docs and generates an answer using OpenAI's Chat model.
+
+    Pass a pre-loaded FAISS vectorstore as `vs` to skip loading it from `persist_path`,
+    and a running `DenseSearchBatcher` to share dense searches with concurrent requests.
+    """
+    tokens = [token async for token in generate_answer_stream(query, persist_path, k, model, vs=vs,
+                                                              dense_batcher=dense_batcher)]
+    return "".join(tokens)
 
 if __name__ == "__main__":
     user_query = "What are the proper food storage temperature guidelines?"
-    answer = generate_answer(user_query)
+    answer = asyncio.run(generate_answer(user_query))
     print("\n🤖 Answer:", answer)
@@ -1,11 +1,22 @@
 # 1. Import Libraries
 import os
-from typing import List, Tuple
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
 
 from whoosh import index as windex
+from whoosh.filedb import compound as wcompound
+from whoosh.filedb.structfile import BufferFile
 from whoosh.fields import Schema, ID, NUMERIC, TEXT
 from whoosh.qparser import MultifieldParser, OrGroup
 from langchain_core.documents import Document
+from ingestion.chunk_text import fingerprint_doc_id
+
+
+# ----- knobs -----
+BULK_MAX_PROCS = 4       # writer processes for a bulk (re)build
+BULK_LIMIT_MB = 512      # total indexing memory for a bulk build, split across the processes
+# -----------------
 
 
 # 2. Global Schema Definition (reuse everywhere)
@@ -17,7 +28,71 @@ schema = Schema(
 )
 
 
-# 3. Function to Create/Open a Whoosh Index on Disk
+# 3. Zero-copy Reads for Memory-mapped Segment Files
+class _MemoryViewReader:
+    """
+    Minimal read-only file object over a memoryview.
+
+    Stands in for the `BytesIO(buf)` that Whoosh's BufferFile builds, which copies
+    the whole (already memory-mapped) segment file onto the heap.
+    """
+
+    def __init__(self, buf):
+        self._buf = buf
+        self._pos = 0
+
+    def read(self, n=-1):
+        start = self._pos
+        end = len(self._buf) if n is None or n < 0 else min(start + n, len(self._buf))
+        self._pos = end
+        return bytes(self._buf[start:end])
+
+    def readline(self, limit=-1):
+        end = len(self._buf) if limit is None or limit < 0 else min(self._pos + limit, len(self._buf))
+        i = self._pos
+        while i < end and self._buf[i] != 0x0A:
+            i += 1
+        return self.read(min(i + 1, end) - self._pos)
+
+    def seek(self, pos, whence=0):
+        if whence == 1:
+            pos += self._pos
+        elif whence == 2:
+            pos += len(self._buf)
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        pass
+
+
+class _MemoryViewFile(BufferFile):
+    """
+    BufferFile that reads directly from the mmap-backed memoryview.
+    """
+
+    def __init__(self, buf, name=None, onclose=None):
+        super().__init__(b"", name=name, onclose=onclose)
+        self._buf = buf
+        self.file = _MemoryViewReader(buf)
+
+    def subset(self, position, length, name=None):
+        name = name or self._name
+        return _MemoryViewFile(self._buf[position:position + length], name=name)
+
+
+def _install_memoryview_buffers():
+    """
+    Make Whoosh's compound (mmap'd) segment storage hand out zero-copy files.
+    """
+    if wcompound.BufferFile is not _MemoryViewFile:
+        wcompound.BufferFile = _MemoryViewFile
+
+
+# 4. Function to Create/Open a Whoosh Index on Disk
 def _ensure_index(index_dir: str):
     """
     Create/open a Whoosh index on disk.
@@ -25,6 +100,7 @@ def _ensure_index(index_dir: str):
     Returns:
         whoosh.index.Index: an index object you can use to write or search.
     """
+    _install_memoryview_buffers()
     os.makedirs(index_dir, exist_ok=True)
     
     if not windex.exists_in(index_dir):
@@ -33,29 +109,151 @@ def _ensure_index(index_dir: str):
     return windex.open_dir(index_dir)
 
 
-# 4. Function to Build/Update BM25 Index
-def build_bm25_index(documents: List[Document], index_dir: str) -> str:
+# 5. Function to Build/Update BM25 Index
+def build_bm25_index(documents: List[Document], index_dir: str, mode: str = "incremental") -> str:
     """
     Build/update a BM25 (BM25F under the hood) index from LangChain Documents.
 
+    Modes:
+        - "bulk": recreate the index from scratch and append every document with
+          `add_document`, using up to BULK_MAX_PROCS writer processes that share
+          BULK_LIMIT_MB. Their segments are merged into one on commit, so queries
+          search a single segment. Skips the per-document delete lookup; use for
+          full (re)ingests.
+        - "incremental": open the existing index and `update_document` by doc_id.
+
     Returns:
         str: The path to the index directory.
     """
-    idx = _ensure_index(index_dir)
-    writer = idx.writer(limitmb=256)
+    if mode == "bulk":
+        os.makedirs(index_dir, exist_ok=True)
+        idx = windex.create_in(index_dir, schema)
+        procs = max(1, min(BULK_MAX_PROCS, os.cpu_count() or 1))
+        # limitmb applies per sub-writer; multisegment=False merges their output once
+        writer = idx.writer(limitmb=max(64, BULK_LIMIT_MB // procs), procs=procs, multisegment=False)
+        write = writer.add_document
+    elif mode == "incremental":
+        idx = _ensure_index(index_dir)
+        writer = idx.writer(limitmb=256)
+        write = writer.update_document
+    else:
+        raise ValueError(f"Unknown BM25 build mode: {mode!r} (expected 'bulk' or 'incremental')")
+
     for d in documents:
         md = d.metadata or {}
-        writer.update_document(
-                                doc_id=md.get("doc_id", ""),
-                                source=md.get("source", ""),
-                                page=int(md.get("page", 0)),
-                                content=d.page_content or ""
-                            )
+        write(
+                doc_id=md.get("doc_id", ""),
+                source=md.get("source", ""),
+                page=int(md.get("page", 0)),
+                content=d.page_content or ""
+            )
     writer.commit()
+    bm25_cache.invalidate()
     return index_dir
 
 
-# 5. Function to Run BM25 Search
+# 6. Class to Keep BM25 Indexes Open with a Pool of Warm Searchers
+class BM25Cache:
+    """
+    Caches, per index directory, the open Whoosh index and a pool of idle searchers.
+
+    A live Searcher keeps its segment readers and term statistics (IDF, field
+    lengths) loaded, so warm queries skip reopening the index and recomputing
+    them. Searchers are handed out one per caller, since a Whoosh Searcher must
+    not run two searches at once.
+
+    An entry is reopened on next use when `invalidate()` has bumped the version
+    counter (in-process writes), or when the index's table of contents on disk
+    changed since it was opened (e.g. `pipeline_runner.py` rebuilt it in another
+    process). Stale searchers are closed instead of going back to the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entries: Dict[str, tuple] = {}  # index_dir -> (version, toc signature, index, idle searchers)
+
+    def invalidate(self):
+        """
+        Mark every cached index as stale (call after writing to an index).
+        """
+        with self._lock:
+            self._version += 1
+
+    @staticmethod
+    def _toc_signature(idx):
+        """
+        Identify the on-disk index version: latest TOC generation + the TOC file's
+        inode and modification time. A bulk rebuild recreates the index at the same
+        generation, so the generation alone is not enough.
+        """
+        try:
+            gen = idx.latest_generation()
+            st = os.stat(os.path.join(idx.storage.folder, windex.TOC._filename(idx.indexname, gen)))
+            return gen, st.st_ino, st.st_mtime_ns
+        except OSError:
+            return None
+
+    @contextmanager
+    def get_searcher(self, index_dir: str):
+        """
+        Borrow a searcher for `index_dir`; it returns to the pool on exit.
+        """
+        current = self._entries.get(index_dir)
+        signature = self._toc_signature(current[2]) if current is not None else None
+
+        stale = []
+        with self._lock:
+            entry = self._entries.get(index_dir)
+            if entry is None or entry[0] != self._version or (entry is current and entry[1] != signature):
+                if entry is not None:
+                    stale = entry[3]
+                _install_memoryview_buffers()
+                idx = windex.open_dir(index_dir)
+                entry = (self._version, self._toc_signature(idx), idx, [])
+                self._entries[index_dir] = entry
+            _, _, idx, pool = entry
+            searcher = pool.pop() if pool else None
+
+        for old in stale:
+            old.close()
+        if searcher is None:
+            searcher = idx.searcher()
+        try:
+            yield searcher
+        finally:
+            with self._lock:
+                if self._entries.get(index_dir) is entry:
+                    pool.append(searcher)
+                else:
+                    searcher.close()
+
+
+bm25_cache = BM25Cache()
+
+# Query parsers per index directory (parsing is thread-safe; searching is not)
+_PARSERS: Dict[str, MultifieldParser] = {}
+
+
+def _get_parser(index_dir: str, index_schema) -> MultifieldParser:
+    """
+    Return the cached MultifieldParser for `index_dir`, building it on first use.
+    """
+    qp = _PARSERS.get(index_dir)
+    if qp is None:
+        qp = _PARSERS.setdefault(index_dir, MultifieldParser(["content"], schema=index_schema, group=OrGroup))
+    return qp
+
+
+def _hit_doc_id(hit) -> str:
+    """
+    Return the hit's doc_id, or for chunks indexed without one (legacy ingests
+    stored ""), the same source+content fingerprint `load_vectorstore` assigns.
+    """
+    return hit.get("doc_id") or fingerprint_doc_id(hit.get("source", ""), hit.get("content", ""))
+
+
+# 7. Function to Run BM25 Search
 def search_bm25(query: str, index_dir: str, top_k: int = 60) -> List[Tuple[Document, float]]:
     """
     Run a BM25 search and return LangChain Documents with their relevance scores.
@@ -63,18 +261,47 @@ def search_bm25(query: str, index_dir: str, top_k: int = 60) -> List[Tuple[Docum
     Returns:
         List[(Document, score)]: Pairs of LangChain Document and BM25 score.
     """
-    idx = windex.open_dir(index_dir)
-    qp = MultifieldParser(["content"], schema=idx.schema, group=OrGroup)
-    q = qp.parse(query)
-    docs = []
-    with idx.searcher() as s:
-        results = s.search(q, limit=top_k)
-        for r in results:
-            docs.append((
-                Document(
-                            page_content=r["content"],
-                            metadata={"doc_id": r["doc_id"], "source": r["source"], "page": int(r["page"])}
-                        ),
-                float(r.score),
-            ))
-    return docs
+    return search_bm25_multi([query], index_dir, top_k=top_k)[0]
+
+
+# 8. Function to Run BM25 Search for Several Queries with One Searcher
+def search_bm25_multi(queries: List[str], index_dir: str, top_k: int = 60) -> List[List[Tuple[Document, float]]]:
+    """
+    Run BM25 searches for several queries with a single (cached, warm) searcher.
+
+    Returns:
+        List[List[(Document, score)]]: One result list per query, in input order.
+    """
+    all_docs = []
+    with bm25_cache.get_searcher(index_dir) as s:
+        qp = _get_parser(index_dir, s.schema)
+        for q in [qp.parse(q) for q in queries]:
+            docs = []
+            results = s.search(q, limit=top_k)
+            for r in results:
+                docs.append((
+                    Document(
+                                page_content=r["content"],
+                                metadata={"doc_id": _hit_doc_id(r), "source": r["source"], "page": int(r["page"])}
+                            ),
+                    float(r.score),
+                ))
+            all_docs.append(docs)
+    return all_docs
+
+
+# 9. Function to Run BM25 Search for Several Queries, Returning doc_ids Only
+def search_bm25_ids_multi(queries: List[str], index_dir: str, top_k: int = 60) -> List[List[Tuple[str, float]]]:
+    """
+    Same searches as `search_bm25_multi`, but without building Documents: the
+    retriever only needs doc_ids to fuse and reads the final rows from the chunk table.
+
+    Returns:
+        List[List[(doc_id, score)]]: One result list per query, in input order.
+    """
+    all_hits = []
+    with bm25_cache.get_searcher(index_dir) as s:
+        qp = _get_parser(index_dir, s.schema)
+        for q in [qp.parse(q) for q in queries]:
+            all_hits.append([(_hit_doc_id(r), float(r.score)) for r in s.search(q, limit=top_k)])
+    return all_hits
@@ -0,0 +1,79 @@
+# 1. Import Libraries
+import os
+from typing import Iterable, List
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from langchain_core.documents import Document
+
+
+# 2. Global Chunk Table Schema (one column per metadata field)
+CHUNK_SCHEMA = pa.schema([
+                            ("doc_id", pa.string()),
+                            ("parent_id", pa.string()),
+                            ("source", pa.string()),
+                            ("page", pa.int32()),
+                            ("page_content", pa.string()),
+                        ])
+
+
+# 3. Function to Convert Documents into a Columnar Chunk Table
+def documents_to_table(documents: Iterable[Document]) -> pa.Table:
+    """
+    Convert LangChain Documents into a columnar (structure-of-arrays) table.
+
+    Returns:
+        pyarrow.Table with columns doc_id | parent_id | source | page | page_content.
+    """
+    documents = list(documents)
+    metadatas = [d.metadata or {} for d in documents]
+    return pa.table(
+                        {
+                            "doc_id": [md.get("doc_id") for md in metadatas],
+                            "parent_id": [md.get("parent_id") for md in metadatas],
+                            "source": [md.get("source") for md in metadatas],
+                            "page": [md.get("page") for md in metadatas],
+                            "page_content": [d.page_content for d in documents],
+                        },
+                        schema=CHUNK_SCHEMA
+                    )
+
+
+# 4. Function to Save the Chunk Table to Disk
+def save_chunks(table: pa.Table, path: str) -> str:
+    """
+    Write the chunk table as an Arrow IPC file.
+
+    Returns:
+        str: The path to the written file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with pa.OSFile(path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    print(f"Chunk table saved at: {path}")
+    return path
+
+
+# 5. Function to Load the Chunk Table from Disk
+def load_chunks(path: str) -> pa.Table:
+    """
+    Load the chunk table, memory-mapped (columns are not copied onto the heap).
+
+    Returns:
+        pyarrow.Table with the CHUNK_SCHEMA columns.
+    """
+    return ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+# 6. Function to Materialize Documents for Selected Rows Only
+def table_to_documents(table: pa.Table, rows: List[int]) -> List[Document]:
+    """
+    Build LangChain Documents for the given row indices, in the given order.
+
+    Returns:
+        List of Documents whose metadata holds every non-content column.
+    """
+    documents = []
+    for record in table.take(rows).to_pylist():
+        content = record.pop("page_content")
+        documents.append(Document(page_content=content, metadata=record))
+    return documents
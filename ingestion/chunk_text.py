@@ -1,20 +1,106 @@
 # 1. Import Libraries
+import hashlib
+from functools import lru_cache
+from typing import Optional
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
 
-# 2. Function to Split Text into Chunks and Adds Metadata.
+# ----- knobs -----
+MERGE_SLACK = 1.1        # merged child chunks may grow up to child_tokens * MERGE_SLACK
+MIN_CHUNK_CHARS = 100    # smaller chunks are always folded into a neighbour
+# -----------------
+
+
+# 2. Function to Build (Once) a Splitter for a Given Size/Overlap
+@lru_cache(maxsize=8)
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """
+    Returns a cached RecursiveCharacterTextSplitter for the given settings.
+    """
+    return RecursiveCharacterTextSplitter(
+                                            chunk_size=chunk_size,
+                                            chunk_overlap=chunk_overlap,
+                                            separators=["\n\n", "\n", ".", " ", ""]
+                                        )
+
+
+# 3. Function to Fingerprint a Chunk that Has No doc_id
+def fingerprint_doc_id(source: str, content: str) -> str:
+    """
+    Derives a stable doc_id from a chunk's source and text, for stores and
+    indexes built before chunks carried one. FAISS and BM25 use the same
+    scheme, so the same legacy chunk gets the same id in both.
+
+    Returns a string like "file.pdf-<16 hex chars>".
+    """
+    digest = hashlib.blake2b((content or "").encode("utf-8"), digest_size=8).hexdigest()
+    return f"{source or ''}-{digest}"
+
+
+# 4. Function to Locate Each Splitter Chunk in its Source Text
+def _chunk_spans(text: str, chunks: list[str], max_overlap: int) -> Optional[list[tuple[int, int]]]:
+    """
+    Finds the (start, end) offset of every chunk in `text`. Consecutive chunks
+    start in order, at most `max_overlap` characters before the previous end.
+
+    Returns the list of spans, or None if a chunk cannot be located.
+    """
+    spans: list[tuple[int, int]] = []
+    for chunk in chunks:
+        search_from = max(spans[-1][0] + 1, spans[-1][1] - max_overlap) if spans else 0
+        start = text.find(chunk, search_from)
+        if start == -1:
+            return None
+        spans.append((start, start + len(chunk)))
+    return spans
+
+
+# 5. Function to Greedily Merge Small Adjacent Chunks
+def _merge_small_chunks(text: str, chunks: list[str], max_chars: int, max_overlap: int,
+                        min_chars: int = MIN_CHUNK_CHARS) -> list[str]:
+    """
+    Second pass over the splitter output: greedily merges adjacent chunks while
+    the result stays under `max_chars`, and always folds chunks shorter than
+    `min_chars` into a neighbour.
+
+    Merging works on the chunks' offsets in `text`, so a merged chunk is the
+    exact source text they cover (overlap kept once, nothing lost between them).
+
+    Returns the merged list of chunk strings, in order.
+    """
+    spans = _chunk_spans(text, chunks, max_overlap)
+    if spans is None:
+        return chunks
+
+    merged: list[tuple[int, int]] = []
+    buf = None
+    for start, end in spans:
+        if buf is None:
+            buf = (start, end)
+            continue
+        if end - buf[0] <= max_chars or buf[1] - buf[0] < min_chars or end - start < min_chars:
+            buf = (buf[0], end)
+        else:
+            merged.append(buf)
+            buf = (start, end)
+
+    if buf is not None:
+        if merged and buf[1] - buf[0] < min_chars:
+            merged[-1] = (merged[-1][0], buf[1])
+        else:
+            merged.append(buf)
+    return [text[start:end] for start, end in merged]
+
+
+# 6. Function to Split Text into Chunks and Adds Metadata.
 def split_with_metadata(text: str, source: str, chunk_size=500, chunk_overlap=100) -> list[Document]:
     """
     Splits text into chunks and adds metadata (source filename and chunk index).
 
     Returns a list of LangChain Document objects.
     """
-    splitter = RecursiveCharacterTextSplitter(
-                                                chunk_size=chunk_size,
-                                                chunk_overlap=chunk_overlap,
-                                                separators=["\n\n", "\n", ".", " ", ""]
-                                            )
+    splitter = _get_splitter(chunk_size, chunk_overlap)
     chunks = splitter.split_text(text)
     
     documents = [
@@ -28,7 +114,7 @@ def split_with_metadata(text: str, source: str, chunk_size=500, chunk_overlap=10
     return documents
 
 
-# 3. Function to Split Text into Chunks and Adds Metadata.
+# 7. Function to Split Text into Chunks and Adds Metadata.
 def split_parent_child(pages: list[dict], source: str, child_tokens: int = 220, overlap_tokens: int = 40) -> list[Document]:
     """
     Splits text into chunks and adds metadata (source filename and chunk index).
@@ -38,18 +124,19 @@ def split_parent_child(pages: list[dict], source: str, child_tokens: int = 220,
     - parent_id: source::p{page}
     - page: page number (1-based)
     - source: original filename
+
+    Small splitter outputs (e.g. page tails) are merged with their neighbours
+    on the same page, so fewer, fuller chunks get embedded and indexed.
     """
-    splitter = RecursiveCharacterTextSplitter(
-                                                chunk_size=child_tokens,
-                                                chunk_overlap=overlap_tokens,
-                                                separators=["\n\n", "\n", ".", " ", ""]
-                                            )
+    splitter = _get_splitter(child_tokens, overlap_tokens)
+    max_chars = int(child_tokens * MERGE_SLACK)
 
     docs: list[Document] = []
     for p in pages:
         page_no = p["page_number"]
         parent_id = f"{source}::p{page_no}"
-        chunks = splitter.split_text(p["text"] or "")
+        text = p["text"] or ""
+        chunks = _merge_small_chunks(text, splitter.split_text(text), max_chars, overlap_tokens)
         for i, chunk in enumerate(chunks):
             doc_id = f"{parent_id}::c{i}"
             docs.append(
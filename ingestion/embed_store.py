@@ -1,10 +1,52 @@
 # 1. Import Libraries
 import os
+import math
+import faiss
+import numpy as np
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
 
 
-# 2. Function to Embed and Store Documents in a VectorDB - Currently FAISS
+# ----- knobs -----
+EMBED_BATCH_SIZE = 1024   # inputs per embeddings request
+IVF_MIN_VECTORS = 10_000  # below this an exact flat scan is already cheap
+IVF_NPROBE = 16           # inverted lists visited per query (default; tunable at load time)
+# -----------------
+
+
+# 2. Function to Build an Empty (Trained) FAISS Index Sized for the Corpus
+def _build_faiss_index(vecs: np.ndarray) -> faiss.Index:
+    """
+    Build an empty FAISS index for the given embedding matrix, trained if needed.
+
+    Vectors are expected to be L2-normalized and are searched by inner product
+    (= cosine similarity). They are stored as FP16 (scalar quantizer), halving
+    index memory and the bytes scanned per query compared with FP32.
+
+    - Small corpora (< IVF_MIN_VECTORS): exact scan, `IndexScalarQuantizer`.
+    - Larger corpora: `IndexIVFScalarQuantizer` with nlist = sqrt(N) lists, so a
+      query scans roughly `IVF_NPROBE` / nlist of the vectors instead of all of them.
+
+    Returns:
+        faiss.Index ready for `.add(vecs)`.
+    """
+    n, d = vecs.shape
+    if n < IVF_MIN_VECTORS:
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    else:
+        nlist = int(math.sqrt(n))
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFScalarQuantizer(quantizer, d, nlist, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = IVF_NPROBE
+
+    if not index.is_trained:
+        index.train(vecs)
+    return index
+
+
+# 3. Function to Embed and Store Documents in a VectorDB - Currently FAISS
 def embed_and_store(documents, persist_path="faiss_index", api_key=None):
     """
     Embeds the provided documents and stores them in a FAISS index.
@@ -13,13 +55,30 @@ def embed_and_store(documents, persist_path="faiss_index", api_key=None):
     """
     if not api_key:
         raise ValueError("OpenAI API key must be provided to embed_and_store")
+    if not all("doc_id" in (d.metadata or {}) for d in documents):
+        raise ValueError("Every document passed to embed_and_store must have a 'doc_id' in its metadata")
 
     embedding_model = OpenAIEmbeddings(
                                         model="text-embedding-3-small",
-                                        openai_api_key=api_key
+                                        openai_api_key=api_key,
+                                        chunk_size=EMBED_BATCH_SIZE
                                     )
-    
-    vectorstore = FAISS.from_documents(documents, embedding_model)
+
+    # Embed explicitly in large batches (EMBED_BATCH_SIZE inputs per request)
+    texts = [d.page_content for d in documents]
+    vecs = np.asarray(embedding_model.embed_documents(texts), dtype="float32")
+
+    # Unit-normalize once at index time so inner product == cosine similarity
+    faiss.normalize_L2(vecs)
+
+    # Build the index ourselves (flat or IVF) and let LangChain fill the docstore
+    index = _build_faiss_index(vecs)
+    vectorstore = FAISS(embedding_model, index, InMemoryDocstore(), {},
+                        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT)
+    vectorstore.add_embeddings(
+                                list(zip(texts, vecs)),
+                                metadatas=[d.metadata for d in documents]
+                            )
 
     os.makedirs(persist_path, exist_ok=True)
     vectorstore.save_local(persist_path)
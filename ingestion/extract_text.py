@@ -1,50 +1,79 @@
 # 1. Import Libraries
-from PyPDF2 import PdfReader
 import os
+from concurrent.futures import ProcessPoolExecutor
+import pypdfium2 as pdfium
 
 
-# 2. Function to Extract Text from PDFs
+# 2. Function to Extract the Pages of a Single PDF (runs in a worker process)
+def _extract_one(path):
+    """
+    Function to extract text, with pages, from a single PDF file.
+
+    Returns:
+            ("file.pdf", [ {"page_number": 1, "text": "..."}, ... ])
+    """
+    pdf = pdfium.PdfDocument(path)
+    pages = []
+    try:
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            # PDFium reports line breaks as CRLF
+            txt = textpage.get_text_range().replace("\r\n", "\n")
+            textpage.close()
+            page.close()
+            if txt.strip():
+                pages.append({"page_number": i + 1, "text": txt})
+    finally:
+        pdf.close()
+
+    return os.path.basename(path), pages
+
+
+# 3. Function to Extract Pages from All PDFs in a Folder in Parallel
+def _extract_folder(pdf_folder):
+    """
+    Function to extract text, with pages, from all PDF files in a folder,
+    one worker process per CPU.
+
+    Returns:
+            [ ("file.pdf", [ {"page_number": 1, "text": "..."}, ... ]), ... ]
+    """
+    paths = [os.path.join(pdf_folder, file) for file in os.listdir(pdf_folder) if file.endswith(".pdf")]
+    if not paths:
+        return []
+
+    with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as ex:
+        return list(ex.map(_extract_one, paths))
+
+
+# 4. Function to Extract Text from PDFs
 def extract_text_from_pdfs(pdf_folder):
     """
     Function to extract text from PDF files.
-    
+
     Returns:
             {"file_1.pdf": "text_1",
             "file_2.pdf": "text_2"}
     """
     text_data = {}
-    for file in os.listdir(pdf_folder):
-        if file.endswith(".pdf"):
-            path = os.path.join(pdf_folder, file)
-            reader = PdfReader(path)
-            full_text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-            text_data[file] = full_text
-    
+    for file, pages in _extract_folder(pdf_folder):
+        text_data[file] = "\n".join([p["text"] for p in pages])
+
     return text_data
 
 
-# 3. Function to Extract Text, with Pages, from PDFs
+# 5. Function to Extract Text, with Pages, from PDFs
 def extract_text_with_pages(pdf__folder):
     """
     Function to extract text, with pages, from PDF files.
-    
-    Returns: 
+
+    Returns:
             { "file.pdf": [ {"page_number": 1, "text": "..."},
                             {"page_number": 2, "text": "..."} ] }
     """
     data = {}
-    for file in os.listdir(pdf__folder):
-        if not file.endswith(".pdf"):
-            continue
-        
-        path = os.path.join(pdf__folder, file)
-        reader = PdfReader(path)
-        pages = []
-        for i, page in enumerate(reader.pages, start=1):
-            txt = page.extract_text() or ""
-            if txt.strip():
-                pages.append({"page_number": i, "text": txt})
-        
+    for file, pages in _extract_folder(pdf__folder):
         if pages:
             data[file] = pages
 
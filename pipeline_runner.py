@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 from ingestion.extract_text import extract_text_with_pages, extract_text_from_pdfs
 from ingestion.chunk_text import split_parent_child, split_with_metadata
 from ingestion.embed_store import embed_and_store
+from ingestion.arrow_store import documents_to_table, save_chunks
 from indexing.bm25_index import build_bm25_index
 
 
@@ -11,6 +12,7 @@ from indexing.bm25_index import build_bm25_index
 DATA_DIR = "data/pdfs"
 VECTORSTORE_DIR = "vectorstores/faiss_topic"
 BM25_DIR = "vectorstores/bm25_index"
+CHUNKS_PATH = "vectorstores/chunks.arrow"
 
 
 # 3. Define Pipeline Function
@@ -43,19 +45,24 @@ def run_pipeline():
         print("No text chunks generated. Check PDF contents.")
         return
 
-    # (4) Dense Embeddings + FAISS
-    print("[4] Creating embeddings and saving FAISS index...")
+    # (4) Columnar Chunk Table (Arrow) used at Query Time
+    print("[4] Saving chunk table (Arrow)...")
+    save_chunks(documents_to_table(all_child_docs), CHUNKS_PATH)
+
+    # (5) Dense Embeddings + FAISS
+    print("[5] Creating embeddings and saving FAISS index...")
     embed_and_store(all_child_docs, persist_path=VECTORSTORE_DIR, api_key=api_key)
 
-    # (5) BM25 Lexical Index
-    print("[5] Building BM25 (Whoosh) index...")
+    # (6) BM25 Lexical Index
+    print("[6] Building BM25 (Whoosh) index...")
     os.makedirs(BM25_DIR, exist_ok=True)
-    build_bm25_index(all_child_docs, index_dir=BM25_DIR)
+    build_bm25_index(all_child_docs, index_dir=BM25_DIR, mode="bulk")
 
-    # (6) Completion
-    print("[6] Pipeline completed successfully!")
+    # (7) Completion
+    print("[7] Pipeline completed successfully!")
     print(f"FAISS at: {VECTORSTORE_DIR}")
     print(f"BM25  at: {BM25_DIR}")
+    print(f"Chunks at: {CHUNKS_PATH}")
 
 
 # 4. Execute Pipeline
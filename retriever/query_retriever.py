@@ -1,15 +1,31 @@
 # 1. Import Libraries
 import os
+import re
+import logging
+import json
+import heapq
+import asyncio
+import threading
+from contextlib import suppress
+from functools import lru_cache
+from cachetools import TTLCache
+import faiss
+import numpy as np
 from dotenv import load_dotenv
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional, Union
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_core.documents import Document
+import pyarrow as pa
+from ingestion.arrow_store import documents_to_table, load_chunks, table_to_documents
+from ingestion.chunk_text import fingerprint_doc_id
 
 
 # 2. Optional Lexical Search
 try:
-    from indexing.bm25_index import search_bm25
+    from indexing.bm25_index import search_bm25_ids_multi
     HAS_BM25 = True
 except Exception:
     HAS_BM25 = False
@@ -17,18 +33,30 @@ except Exception:
 
 # ----- knobs (could move to yaml later) -----
 DENSE_TOP_K = 60
+DENSE_NPROBE = 16        # IVF lists probed per query (ignored for flat indexes)
 BM25_TOP_K = 60
 RRF_K = 60               # larger → flatter fusion
 FINAL_TOP_K = 5
 USE_MULTI_QUERY = True
 N_REWRITES = 3
 USE_HYDE = True
+KEYWORD_MAX_TOKENS = 3    # queries this short go straight to retrieval, no rewrites
+CONFIDENT_SIMILARITY = 0.6  # raw-query top-1 cosine above which rewrites + HyDE are skipped
+REWRITE_CACHE_SIZE = 1024
+REWRITE_CACHE_TTL = 3600  # seconds
+DENSE_BATCH_MAX = 256     # max query variants coalesced into one embed + FAISS call
+DENSE_BATCH_WAIT_MS = 50  # max time a dense search waits for others to join its batch
 # -------------------------------------------
 
 
 load_dotenv()
+faiss.omp_set_num_threads(os.cpu_count() or 1)
+_REWRITE_CACHE: TTLCache = TTLCache(maxsize=REWRITE_CACHE_SIZE, ttl=REWRITE_CACHE_TTL)
+_REWRITE_CACHE_LOCK = threading.Lock()
 VECTORSTORE_DIR = "vectorstores/faiss_topic"
 BM25_DIR = "vectorstores/bm25_index"
+CHUNKS_PATH = "vectorstores/chunks.arrow"
+logger = logging.getLogger(__name__)
 
 
 # 3. Function to Load a Persisted Vectorstore
@@ -36,180 +64,489 @@ def load_vectorstore(persist_path=VECTORSTORE_DIR) -> FAISS:
     """
     Load a persisted FAISS vector store using OpenAI embeddings.
 
+    The result is cached per `persist_path`, so the index and docstore are
+    deserialized once per process instead of once per query. Every stored
+    Document is guaranteed a `doc_id` in its metadata.
+
     Returns:
         A FAISS vectorstore object ready for similarity_search calls.
     """
+    # Cache on the positional path, so `load_vectorstore()` and `load_vectorstore(path)` share an entry
+    return _load_vectorstore(persist_path)
+
+
+@lru_cache(maxsize=4)
+def _load_vectorstore(persist_path: str) -> FAISS:
     embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
-    return FAISS.load_local(persist_path, embedding_model, allow_dangerous_deserialization=True)
+    vs = FAISS.load_local(persist_path, embedding_model, allow_dangerous_deserialization=True)
+
+    # Legacy stores may lack doc_id: fingerprint those chunks once, here, not per query
+    for d in vs.docstore._dict.values():
+        if "doc_id" not in d.metadata:
+            d.metadata["doc_id"] = fingerprint_doc_id(d.metadata.get("source", ""), d.page_content)
+
+    # Indexes built from normalized vectors are searched by inner product (cosine)
+    if vs.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        vs.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+    else:
+        vs.distance_strategy = DistanceStrategy.EUCLIDEAN_DISTANCE
+
+    # IVF indexes trade recall for speed via nprobe; flat indexes have no IVF part
+    ivf = faiss.try_extract_index_ivf(vs.index)
+    if ivf is not None:
+        ivf.nprobe = DENSE_NPROBE
+    return vs
+
+
+# 4. Class to Serve FAISS Docstore Lookups from the Chunk Table
+class _TableDocstore(Docstore):
+    """
+    Read-only docstore backed by the Arrow chunk table.
+
+    Replaces the FAISS InMemoryDocstore once the table is built, so each chunk's
+    text lives once (in the table) rather than also as a resident Python Document.
+    LangChain calls (`similarity_search`, ...) keep working; lookups build the
+    Document from its table row on demand.
+    """
+
+    def __init__(self, table: pa.Table, row_of_id: Dict[str, int]):
+        self._table = table
+        self._row_of_id = row_of_id  # docstore id -> table row
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._row_of_id.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        return table_to_documents(self._table, [row])[0]
+
+
+# 5. Function to Load the Columnar Chunk Table
+def load_chunk_table(chunks_path=CHUNKS_PATH, persist_path=VECTORSTORE_DIR,
+                     vs: Optional[FAISS] = None) -> Tuple[pa.Table, Dict[str, int], np.ndarray]:
+    """
+    Load the Arrow chunk table (doc_id | parent_id | source | page | page_content)
+    with two lookups into it: doc_id -> row (for BM25 hits) and FAISS position -> row
+    (for dense hits). Retrieval works on row numbers only, and only the final top-k
+    rows are materialized as Documents.
+
+    The table is checked against the FAISS index once, here. If it is missing, or
+    lacks chunks the index holds (e.g. left stale by a re-ingest), a table derived
+    from the FAISS docstore is used instead, with a warning in the latter case.
+    The store's docstore is then swapped for a `_TableDocstore` over the table, so
+    chunk text is not held twice.
+
+    `vs` is the loaded store at `persist_path` (loaded if None). The result is
+    cached per (chunks_path, store).
 
+    Returns:
+        (pyarrow.Table, {doc_id: row}, int64 array of table rows indexed by FAISS position)
+    """
+    if vs is None:
+        vs = load_vectorstore(persist_path)
+    return _load_chunk_table(chunks_path, vs)
+
+
+@lru_cache(maxsize=4)
+def _load_chunk_table(chunks_path: str, vs: FAISS) -> Tuple[pa.Table, Dict[str, int], np.ndarray]:
+    docstore_ids = [vs.index_to_docstore_id[i] for i in range(vs.index.ntotal)]
+    faiss_docs = [vs.docstore.search(docstore_id) for docstore_id in docstore_ids]
+    faiss_ids = [d.metadata["doc_id"] for d in faiss_docs]
+
+    table = None
+    if os.path.exists(chunks_path):
+        table = load_chunks(chunks_path)
+        row_of = {doc_id: row for row, doc_id in enumerate(table.column("doc_id").to_pylist())}
+        missing = sum(1 for doc_id in faiss_ids if doc_id not in row_of)
+        if missing:
+            logger.warning(
+                            "%s lacks %d of the %d chunks in the FAISS index (stale?); "
+                            "falling back to the FAISS docstore", chunks_path, missing, len(faiss_ids)
+                        )
+            table = None
+
+    if table is None:
+        table = documents_to_table(faiss_docs)
+        row_of = {doc_id: row for row, doc_id in enumerate(faiss_ids)}
+
+    faiss_rows = np.fromiter((row_of[doc_id] for doc_id in faiss_ids), dtype=np.int64, count=len(faiss_ids))
+
+    # The table now holds every chunk: drop the per-chunk Documents behind the FAISS store
+    vs.docstore = _TableDocstore(table, dict(zip(docstore_ids, faiss_rows.tolist())))
+    return table, row_of, faiss_rows
+
+
+# 6. Function to Perform Batched Dense Retrieval for Several Queries at Once
+def _dense_search_batch(vs: FAISS, queries: List[str], k: int) -> List[List[Tuple[int, float]]]:
+    """
+    Perform dense (vector) retrieval for all query variants in one shot.
+
+    All queries are embedded with a single embeddings request and probed with a
+    single FAISS batch search, so the index scan runs as one matrix-matrix product.
+
+    Query vectors are L2-normalized, matching the normalized vectors stored at index time.
+
+    Returns:
+        One list of (FAISS position, score) per query, in the same order as `queries`.
+        Scores are the raw FAISS values: cosine similarity for inner-product
+        indexes (higher = closer), squared L2 distance for older L2 indexes.
+    """
+    vecs = np.asarray(vs.embedding_function.embed_documents(queries), dtype="float32")
+    faiss.normalize_L2(vecs)
+    D, I = vs.index.search(vecs, k)
+
+    results: List[List[Tuple[int, float]]] = []
+    for dists, idxs in zip(D, I):
+        # FAISS pads with -1 when fewer than k vectors are available
+        results.append([(int(idx), float(dist)) for dist, idx in zip(dists, idxs) if idx != -1])
+    return results
 
-# 4. Function to Perform Dense Vector Retrieval using FAISS
-def _dense_search(vs: FAISS, q: str, k: int) -> List[Tuple[Document, float]]:
+
+# 7. Function to Run Lexical Search for All Variants, If a BM25 Index Exists
+def _run_lexical(queries: List[str], bm25_dir: str) -> Optional[List[List[Tuple[str, float]]]]:
     """
-    Perform dense (vector) retrieval using FAISS.
+    Run BM25 search for all variants with a single searcher.
 
     Returns:
-        List of (Document, score) where score is similarity (higher = closer).
-        If `.similarity_search_with_score` is unavailable, scores default to 0.0.
+        One list of (doc_id, score) per query, or None if BM25 is unavailable.
     """
+    if not (HAS_BM25 and os.path.isdir(bm25_dir)):
+        return None
     try:
-        return vs.similarity_search_with_score(q, k=k)
+        return search_bm25_ids_multi(queries, bm25_dir, top_k=BM25_TOP_K)
     except Exception:
-        # Fallback if with_score not available
-        docs = vs.similarity_search(q, k=k)
-        return [(d, 0.0) for d in docs]
+        return None  # if index missing/corrupt, just skip
+
+
+# 8. Function to Create a Shared Async OpenAI Client
+@lru_cache(maxsize=1)
+def _openai_client():
+    """
+    Create the async OpenAI client once and reuse its connection pool.
+    """
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
-# 5. Function to Generate Multiple Query Rewrites and perform an [Optional] HyDE.
-def _generate_rewrites_openai(query: str, n: int = 3, hyde: bool = True) -> List[str]:
+# 9. Function to Generate Multiple Query Rewrites and perform an [Optional] HyDE.
+async def _generate_rewrites_openai(query: str, n: int = 3, hyde: bool = True) -> List[str]:
     """
     Generate multiple query rewrites and an [optional] HyDE hypothesis.
 
+    Results are kept in a TTL LRU cache keyed by the normalized query, so a
+    repeated question skips the chat round-trip entirely.
+
     Returns:
         A list like: [original_query, paraphrase_1, ..., paraphrase_n, hyde_text?]
     """
-    from openai import OpenAI
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    cache_key = (query.strip().lower(), n, hyde)
+    with _REWRITE_CACHE_LOCK:
+        cached = _REWRITE_CACHE.get(cache_key)
+    if cached is not None:
+        return [query] + cached
+
+    client = _openai_client()
 
-    # Step 1: Ask the Model for n Paraphrases (one per line).
+    # Step 1: Ask the Model for n Paraphrases (+ HyDE) in a Single JSON Response.
+    # The HyDE “mini-answer” acts as a semantic probe!
+    if hyde:
+        instructions = (f"Rewrite the following search query into {n} different short variants, "
+                        "and write a 2-3 sentence factual mini-answer that could answer it. "
+                        'Respond with JSON: {"rewrites": [...], "hyde": "..."}')
+    else:
+        instructions = (f"Rewrite the following search query into {n} different short variants. "
+                        'Respond with JSON: {"rewrites": [...]}')
     messages = [
                 {"role": "system", "content": "You rewrite search queries into diverse paraphrases."},
-                {"role": "user", "content": f"Rewrite the following search query into {n} different short variants, one per line:\n\n{query}"}
+                {"role": "user", "content": f"{instructions}\n\n{query}"}
             ]
-    paraphrase_resp = client.chat.completions.create(
-                                                        model="gpt-4o-mini",
-                                                        messages=messages,
-                                                        temperature=0.2,
-                                                        max_tokens=150
-                                                    )
-    
+    resp = await client.chat.completions.create(
+                                                    model="gpt-4o-mini",
+                                                    messages=messages,
+                                                    temperature=0.0,
+                                                    seed=42,
+                                                    max_tokens=270,
+                                                    response_format={"type": "json_object"}
+                                                )
+    payload = json.loads(resp.choices[0].message.content)
+
     # Step 2: Clean and De-duplicate Paraphrases
-    rewrites = [ln.strip("- ").strip() for ln in paraphrase_resp.choices[0].message.content.splitlines() if ln.strip()]
+    rewrites = [str(r).strip("- ").strip() for r in payload.get("rewrites", [])]
     rewrites = [r for r in rewrites if r and r.lower() != query.lower()]
     rewrites = rewrites[:n]
 
-    # Step 3: Generate a Tiny HyDE “mini-answer” - acts as a semantic probe!
+    # Step 3: Keep the HyDE Text, if Requested and Returned
     if hyde:
-        hyde_resp = client.chat.completions.create(
-                                                    model="gpt-4o-mini",
-                                                    messages=[
-                                                                {"role": "system", "content": "Write a 2-3 sentence factual mini-answer that could answer the question."},
-                                                                {"role": "user", "content": query}
-                                                            ],
-                                                    temperature=0.2,
-                                                    max_tokens=120
-                                                )
-        hyde_text = hyde_resp.choices[0].message.content.strip()
-        rewrites.append(hyde_text)
+        hyde_text = str(payload.get("hyde", "")).strip()
+        if hyde_text:
+            rewrites.append(hyde_text)
 
-    # Step 4: Prepend the Original Query and Alway Keep in Candidate Set.
+    # Step 4: Cache the Rewrites, Prepend the Original Query and Alway Keep in Candidate Set.
+    with _REWRITE_CACHE_LOCK:
+        _REWRITE_CACHE[cache_key] = list(rewrites)
     return [query] + rewrites
 
 
-# 6. Function to Perform Reciprocal Rank Fusion (RRF)
-def _rrf_fuse(ranked_lists: List[List[str]], k: int = RRF_K) -> Dict[str, float]:
+# 10. Function to Perform Reciprocal Rank Fusion (RRF)
+def _rrf_fuse(ranked_lists: List[List[int]], k: int = RRF_K) -> Dict[int, float]:
     """
-    Reciprocal Rank Fusion (RRF) across multiple ranked lists.
+    Reciprocal Rank Fusion (RRF) across multiple ranked lists of chunk-table rows.
 
     Returns:
-        Dict mapping doc_id -> fused_score (higher is better).
+        Dict mapping row -> fused_score (higher is better).
     """
-    scores: Dict[str, float] = {}
+    scores: Dict[int, float] = {}
 
     # Step 1: Iterate through Each Ranked List
     for lst in ranked_lists:
-        # Step 2: Add RRF Contribution for each doc_id
-        for rank, doc_id in enumerate(lst, start=1):
-            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+        # Step 2: Add RRF Contribution for each row
+        for rank, row in enumerate(lst, start=1):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank)
     
     return scores
 
 
-# 7. Function to Perform Hybrid Retrieval
-def retrieve_docs(query: str,
+# 11. Function to Detect Short/Keyword Queries that Do Not Need Rewrites
+_ID_LIKE = re.compile(r"\d{4,}")
+
+def _is_keyword_query(query: str) -> bool:
+    """
+    Heuristic gate for lexical-style lookups (few tokens, quoted phrases, IDs/numbers),
+    where paraphrases and HyDE add cost but little recall.
+
+    Returns:
+        True if the query should be searched as-is.
+    """
+    tokens = query.split()
+    if len(tokens) <= KEYWORD_MAX_TOKENS:
+        return True
+    if query.lstrip().startswith('"') or _ID_LIKE.search(query):
+        return True
+    digit_tokens = sum(1 for t in tokens if any(c.isdigit() for c in t))
+    return digit_tokens / len(tokens) >= 0.5
+
+
+# 12. Function to Read the Top-1 Dense Hit as a Cosine Similarity
+def _top_similarity(vs: FAISS, dense_hits: List[Tuple[int, float]]) -> float:
+    """
+    Convert the best dense score into a cosine similarity, whatever the index metric.
+
+    Returns:
+        Cosine similarity of the top hit (0.0 if there are no hits).
+    """
+    if not dense_hits:
+        return 0.0
+    score = dense_hits[0][1]
+    if vs.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+        return score
+    # Squared L2 between unit vectors: ||a - b||^2 = 2 - 2 cos
+    return 1.0 - score / 2.0
+
+
+# 13. Class to Coalesce Dense Searches from Concurrent Requests
+class DenseSearchBatcher:
+    """
+    Dynamic micro-batching for dense retrieval across concurrent requests.
+
+    Callers `await search(queries)`. A single consumer task takes the first
+    pending request, waits up to `max_wait_ms` for more (or until `max_batch`
+    query variants are queued), then embeds and searches all of them with one
+    `_dense_search_batch` call and hands each caller back its own rows.
+    Callers that pass `wait=False` (e.g. a request's second, follow-up pass)
+    flush the batch right away, so a request pays the wait window at most once.
+    If a batch fails, each caller is retried on its own, so one bad input only
+    fails its own request.
+    Must be started (`start()`) from inside the running event loop.
+    """
+
+    def __init__(self, vs: FAISS, max_batch: int = DENSE_BATCH_MAX, max_wait_ms: float = DENSE_BATCH_WAIT_MS):
+        self._vs = vs
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """
+        Spawn the consumer task on the running event loop.
+        """
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Cancel the consumer task and wait for it to exit.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def search(self, queries: List[str], wait: bool = True) -> List[List[Tuple[int, float]]]:
+        """
+        Queue `queries` for the next batch and wait for their results. With
+        `wait=False` the batch is flushed without waiting for more callers.
+
+        Returns:
+            One list of (FAISS position, score) per query, in the same order as `queries`.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((queries, fut, wait))
+        return await fut
+
+    async def _search_alone(self, queries: List[str], fut: asyncio.Future):
+        """
+        Search one caller's queries on their own and settle only that caller's future.
+        """
+        try:
+            results = await asyncio.to_thread(_dense_search_batch, self._vs, queries, DENSE_TOP_K)
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+        else:
+            if not fut.done():
+                fut.set_result(results)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Step 1: Block for the First Request, then Collect Others until Full or Timed Out
+            items = [await self._queue.get()]
+            n_queries = len(items[0][0])
+            deadline = loop.time() + (self._max_wait if items[0][2] else 0.0)
+            while n_queries < self._max_batch:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                items.append(item)
+                n_queries += len(item[0])
+                if not item[2]:
+                    # A caller that must not wait joined: take what is queued and go
+                    deadline = loop.time()
+
+            # Step 2: One Embedding Request + One FAISS Search for the Whole Batch
+            flat = [q for queries, _, _ in items for q in queries]
+            try:
+                results = await asyncio.to_thread(_dense_search_batch, self._vs, flat, DENSE_TOP_K)
+            except Exception:
+                # Retry callers separately, so the exception reaches only the caller(s) that cause it
+                await asyncio.gather(*(self._search_alone(queries, fut) for queries, fut, _ in items if not fut.done()))
+                continue
+
+            # Step 3: Split Rows back per Caller (skip callers that went away)
+            pos = 0
+            for queries, fut, _ in items:
+                if not fut.done():
+                    fut.set_result(results[pos:pos + len(queries)])
+                pos += len(queries)
+
+
+# 14. Function to Perform Hybrid Retrieval
+async def retrieve_docs(query: str,
                   persist_path=VECTORSTORE_DIR,
                   bm25_dir=BM25_DIR,
-                  k: int = FINAL_TOP_K) -> List[Document]:
+                  k: int = FINAL_TOP_K,
+                  vs: Optional[FAISS] = None,
+                  chunks_path=CHUNKS_PATH,
+                  dense_batcher: Optional[DenseSearchBatcher] = None) -> List[Document]:
     """
     Hybrid retrieval with multi-query + optional HyDE and RRF fusion.
 
     Pipeline:
-      Step 1: Load FAISS (dense) index.
-      Step 2: Build a set of query variants (multi-query rewrites + HyDE).
-      Step 3: For each query variant, run:
-              3a) Dense search (FAISS).
-              3b) Lexical search (BM25), if available.
-      Step 4: Convert each result list into ordered doc_id lists.
-      Step 5: Fuse all lists with RRF into a single score per doc_id.
-      Step 6: Map top fused ids back to original Documents and return top-k.
+      Step 1: Load the chunk table and the FAISS (dense) index it is mapped to.
+      Step 2: First pass on the original query only, running concurrently:
+              2a) Dense search (FAISS).
+              2b) Lexical search (BM25), if available.
+      Step 3: Only if the query is not a short/keyword lookup and the first pass is
+              not already confident, build query variants (multi-query rewrites + HyDE)
+              and search them the same way, as one batch. Confident queries never
+              pay for the rewrite LLM call.
+      Step 4: Convert each result list into ordered chunk-table row lists.
+      Step 5: Fuse all lists with RRF into a single score per row.
+      Step 6: Materialize only the top-k rows as Documents.
 
     Args:
         query: The user original query.
         persist_path: Path to FAISS vectorstore on disk.
         bm25_dir: Path to BM25 index directory (if present).
         k: Final number of Documents to return after fusion.
+        vs: The already-loaded FAISS vectorstore at `persist_path`; loaded if None.
+        chunks_path: Path to the Arrow chunk table on disk.
+        dense_batcher: If given, dense searches go through this shared micro-batcher
+            so they are coalesced with concurrent requests.
 
     Returns:
         A list of LangChain `Document` objects, ordered by fused relevance.
     """
-    # Step 1: Load Dense Vector Store (FAISS)
-    vs = load_vectorstore(persist_path)
-
-    # Step 2: Produce Query Variants (multi-query + HyDE)
-    queries = [query]
-    if USE_MULTI_QUERY:
+    # Step 1: Load the FAISS Store (Unless Passed In), then the Chunk Table Mapped onto It
+    if vs is None:
+        vs = await asyncio.to_thread(load_vectorstore, persist_path)
+    table, row_of, faiss_rows = await asyncio.to_thread(load_chunk_table, chunks_path, persist_path, vs)
+
+    # Semantic (FAISS) and Lexical (BM25) Search for a Set of Queries, Overlapped
+    async def _search(queries: List[str], wait: bool = True):
+        if dense_batcher is not None:
+            dense_search = dense_batcher.search(queries, wait=wait)
+        else:
+            dense_search = asyncio.to_thread(_dense_search_batch, vs, queries, DENSE_TOP_K)
+        return await asyncio.gather(
+                                    dense_search,
+                                    asyncio.to_thread(_run_lexical, queries, bm25_dir)
+                                )
+
+    # Step 2: Cheap First Pass on the Original Query
+    dense_batches, lex_batches = await _search([query])
+
+    # Step 3: Expand with Rewrites + HyDE Only When the First Pass Is Not Enough
+    if (USE_MULTI_QUERY and not _is_keyword_query(query)
+            and _top_similarity(vs, dense_batches[0]) < CONFIDENT_SIMILARITY):
         try:
-            queries = _generate_rewrites_openai(query, n=N_REWRITES, hyde=USE_HYDE)
-        except Exception as e:
+            variants = (await _generate_rewrites_openai(query, n=N_REWRITES, hyde=USE_HYDE))[1:]
+        except Exception:
             # If OpenAI not available, just use original
-            queries = [query]
-
-    # Step 3: Prepare Containers for Fusion
-    # - doc_bank stores unique doc_id -> Document to prevent duplicates.
-    # - ranked_lists holds ordered doc_id lists for RRF.
-    doc_bank: Dict[str, Document] = {}
-    ranked_lists: List[List[str]] = []
-
-    # Step 4: Run Semantic and BM25 Retrievals (if available) for Each Query Variant
-    for q in queries:
-        # Step 4.1: Semantic Search
-        dense_hits = _dense_search(vs, q, DENSE_TOP_K)
-        dense_ids = []
-
-        # Step 4.2: Accumulate Semantic Results: Collect IDs & Cache Documents
-        for d, _ in dense_hits:
-            doc_id = (d.metadata or {}).get("doc_id") or f"{(d.metadata or {}).get('source','')}-{hash(d.page_content)}"
-            dense_ids.append(doc_id)
-            if doc_id not in doc_bank:
-                doc_bank[doc_id] = d
-        ranked_lists.append(dense_ids)
-
-        # Step 4.3: Lexical Search (BM25)
-        if HAS_BM25 and os.path.isdir(bm25_dir):
-            try:
-                lex_hits = search_bm25(q, bm25_dir, top_k=BM25_TOP_K)
-                lex_ids = []
-                for d, _ in lex_hits:
-                    doc_id = (d.metadata or {}).get("doc_id") or f"{(d.metadata or {}).get('source','')}-{hash(d.page_content)}"
-                    lex_ids.append(doc_id)
-                    if doc_id not in doc_bank:
-                        doc_bank[doc_id] = d
-                ranked_lists.append(lex_ids)
-            except Exception:
-                pass  # if index missing/corrupt, just skip
-    
-    # Step 5: If Everything Failed >> Do Semantic Search on Original Query Only
-    if not ranked_lists:
-        dense_hits = _dense_search(vs, query, DENSE_TOP_K)
-        return [d for d, _ in dense_hits[:k]]
-
-    # Step 6: Fuse All Ranked Lists into a Single Score per doc_id via RRF
+            variants = []
+        if variants:
+            # The batcher's wait window was already paid by the first pass
+            more_dense, more_lex = await _search(variants, wait=False)
+            dense_batches = dense_batches + more_dense
+            if lex_batches is not None and more_lex is not None:
+                lex_batches = lex_batches + more_lex
+            else:
+                lex_batches = None
+
+    # Step 4: Prepare Containers for Fusion
+    # - ranked_lists holds ordered chunk-table rows for RRF.
+    ranked_lists: List[List[int]] = []
+    has_lex = lex_batches is not None
+    if not has_lex:
+        lex_batches = [[] for _ in dense_batches]
+
+    n_missing = 0
+    for dense_hits, lex_hits in zip(dense_batches, lex_batches):
+        # Step 4.1: Accumulate Semantic Results: FAISS Positions -> Rows
+        ranked_lists.append(faiss_rows[[pos for pos, _ in dense_hits]].tolist())
+
+        # Step 4.2: Accumulate Lexical Results (BM25): doc_ids -> Rows
+        if has_lex:
+            rows = [row_of.get(doc_id) for doc_id, _ in lex_hits]
+            n_missing += rows.count(None)
+            ranked_lists.append([row for row in rows if row is not None])
+
+    if n_missing:
+        logger.warning("%d BM25 hits are not in the chunk table; is the BM25 index at %s stale?", n_missing, bm25_dir)
+
+    # Step 5: Fuse All Ranked Lists into a Single Score per Row via RRF
     fused = _rrf_fuse(ranked_lists, k=RRF_K)
 
-    # Step 7: Sort doc_ids by Fused Score (desc)
-    top_ids = [doc_id for doc_id, _ in sorted(fused.items(), key=lambda kv: kv[1], reverse=True)][:max(k, 30)]
-
-    # Step 8: Map Fused ids back to Document Objects
-    top_docs = [doc_bank[i] for i in top_ids][:k]
+    # Step 6: Select the Best Rows by Fused Score (desc) with a Bounded Heap and Materialize Only Those
+    top_rows = [row for row, _ in heapq.nlargest(k, fused.items(), key=lambda kv: kv[1])]
+    top_docs = table_to_documents(table, top_rows)
 
     return top_docs
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+pytest.importorskip("whoosh")
+
+from whoosh import index as windex
+from langchain_core.documents import Document
+
+from ingestion.chunk_text import fingerprint_doc_id
+from indexing.bm25_index import build_bm25_index, schema, search_bm25, search_bm25_ids_multi, search_bm25_multi
+
+
+def _docs(word, n=10):
+    return [Document(page_content=f"{word} text number {i}",
+                     metadata={"doc_id": f"{word}{i}", "source": "s.pdf", "page": 1})
+            for i in range(n)]
+
+
+def test_multi_search_matches_single_searches(tmp_path):
+    index_dir = str(tmp_path / "bm25")
+    build_bm25_index(_docs("alpha") + _docs("beta"), index_dir, mode="bulk")
+
+    multi = search_bm25_multi(["alpha", "beta"], index_dir, top_k=5)
+    single = [search_bm25(q, index_dir, top_k=5) for q in ["alpha", "beta"]]
+    assert [[d.metadata["doc_id"] for d, _ in hits] for hits in multi] == \
+           [[d.metadata["doc_id"] for d, _ in hits] for hits in single]
+    assert search_bm25_ids_multi(["alpha", "beta"], index_dir, top_k=5) == \
+           [[(d.metadata["doc_id"], score) for d, score in hits] for hits in multi]
+
+
+def test_pooled_searcher_sees_rebuild_from_another_writer(tmp_path):
+    index_dir = str(tmp_path / "bm25")
+    build_bm25_index(_docs("oldword"), index_dir, mode="bulk")
+    assert len(search_bm25("oldword", index_dir)) == 10
+
+    # Rebuild without going through build_bm25_index (as another process would),
+    # so the in-process cache invalidation never runs.
+    idx = windex.create_in(index_dir, schema)
+    writer = idx.writer()
+    for d in _docs("newword"):
+        writer.add_document(doc_id=d.metadata["doc_id"], source="s.pdf", page=1, content=d.page_content)
+    writer.commit()
+
+    assert search_bm25("oldword", index_dir) == []
+    assert len(search_bm25("newword", index_dir)) == 10
+
+
+def test_hits_without_doc_id_get_the_faiss_fingerprint(tmp_path):
+    index_dir = str(tmp_path / "bm25")
+    docs = [Document(page_content=d.page_content, metadata={"source": "s.pdf", "page": 1}) for d in _docs("legacy")]
+    build_bm25_index(docs, index_dir, mode="bulk")
+
+    hits = search_bm25_ids_multi(["legacy"], index_dir)[0]
+    assert sorted(doc_id for doc_id, _ in hits) == sorted(fingerprint_doc_id("s.pdf", d.page_content) for d in docs)
+
+
+def test_bulk_build_leaves_a_single_segment(tmp_path, monkeypatch):
+    # Force several writer processes even on a single-CPU machine
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    index_dir = str(tmp_path / "bm25")
+    build_bm25_index(_docs("alpha", n=200) + _docs("beta", n=200), index_dir, mode="bulk")
+
+    idx = windex.open_dir(index_dir)
+    assert len(idx._segments()) == 1
+    assert idx.doc_count() == 400
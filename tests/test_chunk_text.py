@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from ingestion.chunk_text import _merge_small_chunks, split_parent_child
+
+PDF_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "data", "pdfs")
+
+
+def _assert_chunks_are_substrings(pages, docs):
+    page_text = {p["page_number"]: p["text"] for p in pages}
+    for d in docs:
+        assert d.page_content in page_text[d.metadata["page"]], d.metadata["doc_id"]
+
+
+def test_merge_keeps_text_between_chunks():
+    text = "It was the example of stars"
+    assert _merge_small_chunks(text, ["It was the", "example of stars"], 220, 40) == [text]
+
+
+def test_merge_drops_repeated_overlap_once():
+    text = "alpha beta gamma delta epsilon"
+    merged = _merge_small_chunks(text, ["alpha beta gamma", "gamma delta epsilon"], 220, 40)
+    assert merged == [text]
+
+
+def test_merge_leaves_unlocatable_chunks_untouched():
+    chunks = ["not in", "the text"]
+    assert _merge_small_chunks("something else", chunks, 220, 40) == chunks
+
+
+def test_merged_chunks_are_substrings_of_their_page():
+    words = " ".join(f"word{i}" for i in range(400))
+    pages = [
+        {"page_number": 1, "text": words},
+        {"page_number": 2, "text": "Short page.\n\nIt was the\nexample of stars. " * 20},
+    ]
+    docs = split_parent_child(pages, source="synthetic.pdf")
+    assert docs
+    _assert_chunks_are_substrings(pages, docs)
+
+
+def test_bundled_pdf_chunks_are_substrings_of_their_page():
+    pytest.importorskip("pypdfium2")
+    from ingestion.extract_text import extract_text_with_pages
+
+    for source, pages in extract_text_with_pages(PDF_DIR).items():
+        _assert_chunks_are_substrings(pages, split_parent_child(pages, source=source))
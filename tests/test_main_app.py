@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+# generation.generate_answer builds its OpenAI client at import time
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import app.main_app as main_app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # No lifespan: the retriever is stubbed, so nothing needs loading
+    main_app.app.state.vs = None
+    main_app.app.state.dense_batcher = None
+    return TestClient(main_app.app, raise_server_exceptions=False)
+
+
+def test_retrieval_error_is_an_http_error(client, monkeypatch):
+    async def failing_retrieve(*args, **kwargs):
+        raise RuntimeError("FAISS is down")
+
+    monkeypatch.setattr(main_app, "retrieve_docs", failing_retrieve)
+    assert client.post("/ask", json={"question": "q"}).status_code == 500
+
+
+def test_stream_error_sends_an_error_event(client, monkeypatch):
+    async def fake_retrieve(*args, **kwargs):
+        return []
+
+    async def failing_stream(query, docs):
+        yield "partial"
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(main_app, "retrieve_docs", fake_retrieve)
+    monkeypatch.setattr(main_app, "stream_answer", failing_stream)
+    resp = client.post("/ask", json={"question": "q"})
+    assert resp.status_code == 200
+    assert '"token": "partial"' in resp.text
+    assert "event: error" in resp.text
+    assert "event: done" not in resp.text
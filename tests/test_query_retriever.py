@@ -0,0 +1,130 @@
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import retriever.query_retriever as qr
+from ingestion.arrow_store import documents_to_table, save_chunks
+
+
+def _docs(n=20):
+    return [Document(page_content=f"chunk number {i} about topic {i % 3}",
+                     metadata={"doc_id": f"s.pdf::p1::c{i}", "parent_id": "s.pdf::p1", "source": "s.pdf", "page": 1})
+            for i in range(n)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    embedding = DeterministicFakeEmbedding(size=16)
+    monkeypatch.setattr(qr, "OpenAIEmbeddings", lambda **kw: embedding)
+    persist_path = str(tmp_path / "faiss")
+    FAISS.from_documents(_docs(), embedding).save_local(persist_path)
+    return persist_path
+
+
+def _assert_rows_match_faiss(table, faiss_rows):
+    expected = {i: d.metadata["doc_id"] for i, d in enumerate(_docs())}
+    table_ids = table.column("doc_id").to_pylist()
+    # FAISS.from_documents adds the documents in order, so position == index in _docs()
+    assert [table_ids[row] for row in faiss_rows] == [expected[pos] for pos in range(len(faiss_rows))]
+
+
+def test_chunk_table_rows_follow_faiss_positions(store, tmp_path):
+    chunks_path = str(tmp_path / "chunks.arrow")
+    save_chunks(documents_to_table(reversed(_docs())), chunks_path)
+
+    table, row_of, faiss_rows = qr.load_chunk_table(chunks_path, store)
+    assert table.num_rows == 20
+    _assert_rows_match_faiss(table, faiss_rows)
+
+
+def test_default_and_explicit_paths_share_one_load(store, tmp_path):
+    chunks_path = str(tmp_path / "chunks.arrow")
+    save_chunks(documents_to_table(_docs()), chunks_path)
+
+    vs = qr.load_vectorstore(store)
+    assert qr.load_vectorstore(persist_path=store) is vs
+    table = qr.load_chunk_table(chunks_path, store)
+    assert qr.load_chunk_table(chunks_path=chunks_path, persist_path=store, vs=vs) is table
+
+
+def test_docstore_is_served_from_the_chunk_table(store, tmp_path):
+    chunks_path = str(tmp_path / "chunks.arrow")
+    save_chunks(documents_to_table(_docs()), chunks_path)
+
+    vs = qr.load_vectorstore(store)
+    qr.load_chunk_table(chunks_path, store, vs)
+    assert isinstance(vs.docstore, qr._TableDocstore)
+    doc = vs.docstore.search(vs.index_to_docstore_id[3])
+    assert doc.page_content == _docs()[3].page_content
+    assert doc.metadata["doc_id"] == _docs()[3].metadata["doc_id"]
+
+
+def test_stale_chunk_table_falls_back_to_docstore(store, tmp_path, caplog):
+    chunks_path = str(tmp_path / "chunks.arrow")
+    save_chunks(documents_to_table(_docs()[:5]), chunks_path)
+
+    with caplog.at_level(logging.WARNING, logger=qr.__name__):
+        table, row_of, faiss_rows = qr.load_chunk_table(chunks_path, store)
+    assert "lacks 15 of the 20 chunks" in caplog.text
+    assert table.num_rows == 20
+    _assert_rows_match_faiss(table, faiss_rows)
+
+
+@pytest.mark.parametrize("threshold, expected_calls", [(float("-inf"), 0), (float("inf"), 1)])
+def test_rewrites_run_only_when_first_pass_is_not_confident(store, tmp_path, monkeypatch, threshold, expected_calls):
+    calls = []
+
+    async def fake_rewrites(query, n=3, hyde=True):
+        calls.append(query)
+        return [query, "chunk number seven", "topic two"]
+
+    monkeypatch.setattr(qr, "_generate_rewrites_openai", fake_rewrites)
+    monkeypatch.setattr(qr, "CONFIDENT_SIMILARITY", threshold)
+
+    docs = asyncio.run(qr.retrieve_docs("which topic is chunk number three about", persist_path=store,
+                                        bm25_dir=str(tmp_path / "bm25"), chunks_path=str(tmp_path / "chunks.arrow")))
+    assert len(docs) == qr.FINAL_TOP_K
+    assert len(calls) == expected_calls
+
+
+def test_batcher_failure_only_reaches_the_failing_caller(monkeypatch):
+    def fake_search(vs, queries, k):
+        if any(q == "bad" for q in queries):
+            raise ValueError("input too long")
+        return [[(0, 1.0)] for _ in queries]
+
+    monkeypatch.setattr(qr, "_dense_search_batch", fake_search)
+
+    async def run():
+        batcher = qr.DenseSearchBatcher(vs=None, max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(batcher.search(["good"]), batcher.search(["bad"]), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    good, bad = asyncio.run(run())
+    assert good == [[(0, 1.0)]]
+    assert isinstance(bad, ValueError)
+
+
+def test_batcher_skips_the_wait_window_when_asked(monkeypatch):
+    monkeypatch.setattr(qr, "_dense_search_batch", lambda vs, queries, k: [[] for _ in queries])
+
+    async def run():
+        batcher = qr.DenseSearchBatcher(vs=None, max_wait_ms=10_000)
+        batcher.start()
+        try:
+            return await asyncio.wait_for(batcher.search(["q"], wait=False), timeout=1)
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(run()) == [[]]